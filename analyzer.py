@@ -35,10 +35,14 @@ class ApiClient:
         self.interaction_log_dir = log_dir / "api_interactions"
         self.interaction_log_dir.mkdir(parents=True, exist_ok=True)
     
-    def send_request(self, messages: List[Dict], temperature: float = 1.0, 
+    def send_request(self, messages: List[Dict], temperature: float = 1.0,
                      max_tokens: int = Config.API_MAX_TOKENS, task_name: str = "请求",
-                     json_response: bool = False) -> Optional[str]:
-        """发送 API 请求并返回内容"""
+                     json_response: bool = False, interactive: bool = True) -> Optional[str]:
+        """发送 API 请求并返回内容
+
+        interactive=False 时不在失败后询问用户（供并行工作线程使用），
+        连续失败3次后直接返回 None。
+        """
         data = {
             "model": self.model_name,
             "messages": messages,
@@ -48,10 +52,11 @@ class ApiClient:
         }
         if json_response:
             data["response_format"] = {"type": "json_object"}
-        
-        return self._send_with_retry(data, task_name)
-    
-    def _send_with_retry(self, data: Dict[str, Any], task_name: str) -> Optional[str]:
+
+        return self._send_with_retry(data, task_name, interactive)
+
+    def _send_with_retry(self, data: Dict[str, Any], task_name: str,
+                         interactive: bool = True) -> Optional[str]:
         """发送请求，带重试逻辑"""
         headers = {
             "Authorization": f"Bearer {self.api_key}",
@@ -73,6 +78,8 @@ class ApiClient:
                         time.sleep(2)
             
             self.logger.error(f"{task_name}连续失败3次")
+            if not interactive:
+                return None
             choice = input("\n❌ 网络请求失败。按回车重试，'s' 跳过，'q' 退出: ").lower()
             if choice == 's':
                 return None
@@ -309,9 +316,10 @@ class MemoryManager:
     def _prompt_manual_edit(self):
         """提示用户手动编辑"""
         self.logger.warning(f"⚠️ 记忆库仍过大，需要手动编辑")
+        self.user_profile.flush()  # 确保用户编辑的是最新内容
         print(f"\n🛑 请手动编辑: {self.user_profile.profile_path}")
         input("编辑完成后按回车继续...")
-        self.user_profile.facts = self.user_profile._load_profile()
+        self.user_profile.reload()
 
 
 # ============================================================
@@ -545,15 +553,15 @@ class DeepSeekAnalyzer:
         self.api_client = ApiClient(log_dir)
         self.memory_manager = MemoryManager(user_profile, self.api_client, log_dir) if user_profile else None
     
-    def generate_weekly_summary(self, week_info: WeekInfo) -> Optional[str]:
+    def generate_weekly_summary(self, week_info: WeekInfo, interactive: bool = True) -> Optional[str]:
         """生成周总结"""
         if not week_info.diaries:
             self.logger.warning(f"{week_info} 没有日记")
             return None
         
         week_content = week_info.format_for_ai()
-        start_date = week_info.start_date.strftime('%Y年%m月%d日')
-        end_date = week_info.end_date.strftime('%Y年%m月%d日')
+        start_date = week_info.start_cn
+        end_date = week_info.end_cn
         
         messages = [
             {"role": "system", "content": PromptTemplates.weekly_summary_system()},
@@ -564,14 +572,24 @@ class DeepSeekAnalyzer:
 
 请生成周总结。"""}
         ]
-        
-        return self.api_client.send_request(messages, temperature=1.0, max_tokens=Config.API_MAX_TOKENS, task_name="周总结生成")
+
+        return self.api_client.send_request(
+            messages, temperature=1.0, max_tokens=Config.API_MAX_TOKENS,
+            task_name=f"周总结生成_{week_info.year}W{week_info.week:02d}",
+            interactive=interactive
+        )
     
-    def generate_daily_evaluation(self, current_diary: DiaryEntry, 
-                                   context_diaries: List[DiaryEntry], 
+    def generate_daily_evaluation(self, current_diary: DiaryEntry,
+                                   context_diaries: List[DiaryEntry],
                                    weekly_summaries: List[tuple],
-                                   all_diaries: Optional[List[DiaryEntry]] = None) -> Optional[str]:
-        """生成每日评价和建议"""
+                                   all_diaries: Optional[List[DiaryEntry]] = None,
+                                   interactive: bool = True,
+                                   process_memory: bool = True) -> Optional[str]:
+        """生成每日评价和建议
+
+        process_memory=False 时不立即应用记忆更新（并行批量生成时由
+        调用方在主线程统一调用 apply_memory_updates）。
+        """
         self.logger.info(f"正在为 {current_diary.date.strftime('%Y-%m-%d')} 生成评价...")
         
         # 构建上下文
@@ -595,9 +613,15 @@ class DeepSeekAnalyzer:
 
 请为今天的日记写一段评价和建议。"""}
         ]
-        
-        content = self.api_client.send_request(messages, temperature=1.5, max_tokens=Config.API_MAX_TOKENS, task_name="每日评价生成")
-        return self._process_memory_updates(content)
+
+        content = self.api_client.send_request(
+            messages, temperature=1.5, max_tokens=Config.API_MAX_TOKENS,
+            task_name=f"每日评价生成_{current_diary.date:%Y-%m-%d}",
+            interactive=interactive
+        )
+        if process_memory:
+            return self.apply_memory_updates(content)
+        return content
     
     def generate_weekly_analysis(self, week_diaries: List[DiaryEntry], 
                                   historical_summaries: List[tuple],
@@ -653,15 +677,15 @@ class DeepSeekAnalyzer:
         ]
         
         content = self.api_client.send_request(messages, temperature=1.5, max_tokens=Config.API_MAX_TOKENS, task_name="周分析生成")
-        content = self._process_memory_updates(content)
+        content = self.apply_memory_updates(content)
         
         if content:
             self.save_analysis_result(content, week_diaries)
         
         return content
     
-    def _process_memory_updates(self, content: Optional[str]) -> Optional[str]:
-        """处理响应内容中的记忆更新"""
+    def apply_memory_updates(self, content: Optional[str]) -> Optional[str]:
+        """处理响应内容中的记忆更新，返回清理后的内容"""
         if content and self.memory_manager:
             return self.memory_manager.extract_and_apply_updates(content)
         return content
@@ -30,9 +30,16 @@ class AICleaner:
     """AI 评价清理器"""
     
     AI_VARIANTS = ("AI 说", "AI说", "AI评价", "AI建议")
+    # 行内空白：ASCII 空格/Tab 之外还要涵盖中文输入法常见的
+    # 全角空格 U+3000 与不间断空格 U+00A0（对齐 str.strip 的行为）
+    _WS = rb'(?:[ \t]|\xe3\x80\x80|\xc2\xa0)'
+    # 字节级正则：直接在原始字节上扫描，免去整个文件的解码/再编码
+    # 变体按长度降序排列，长变体优先于共享前缀的短变体
     HEADER_PATTERN = re.compile(
-        r'^#+\s*(' + '|'.join(map(re.escape, AI_VARIANTS)) + r')\s*$',
-        re.IGNORECASE
+        rb'^' + _WS + rb'*#+' + _WS + rb'*('
+        + b'|'.join(re.escape(v.encode('utf-8')) for v in sorted(AI_VARIANTS, key=len, reverse=True))
+        + rb')' + _WS + rb'*\r?$',
+        re.IGNORECASE | re.MULTILINE
     )
     
     def __init__(self):
@@ -89,7 +96,7 @@ class AICleaner:
                 shutil.copy2(f, backup_dir / f.name)
                 count += 1
             except Exception as e:
-                self.logger.error(f"备份失败 {f.name}: {e}")
+                self.logger.error("备份失败 %s: %s", f.name, e)
         
         self.logger.info(f"✅ 成功备份 {count} 个文件")
         Logger.log_separator(self.logger)
@@ -102,7 +109,7 @@ class AICleaner:
         for file_path in files:
             if self._clear_single_file(file_path):
                 result.processed += 1
-                self.logger.info(f"✂️  已清除: {file_path.name}")
+                self.logger.info("✂️  已清除: %s", file_path.name)
             else:
                 result.skipped += 1
         
@@ -111,29 +118,21 @@ class AICleaner:
     def _clear_single_file(self, file_path: Path) -> bool:
         """清理单个文件，返回是否有修改"""
         try:
-            lines = file_path.read_text(encoding='utf-8').splitlines(keepends=True)
-            new_lines = []
-            
-            for line in lines:
-                if self.HEADER_PATTERN.match(line.strip()):
-                    break
-                new_lines.append(line)
-            else:
+            raw = file_path.read_bytes()
+
+            match = self.HEADER_PATTERN.search(raw)
+            if not match:
                 return False  # 未找到 AI 标记
-            
-            # 移除末尾空行
-            while new_lines and not new_lines[-1].strip():
-                new_lines.pop()
-            
-            # 写回（确保末尾换行）
-            content = ''.join(new_lines)
-            if content and not content.endswith('\n'):
-                content += '\n'
-            file_path.write_text(content, encoding='utf-8')
+
+            # 截断到 AI 标记前，并移除末尾空行（末尾换行沿用文件自身风格）
+            cleaned = raw[:match.start()].rstrip()
+            if cleaned:
+                cleaned += b'\r\n' if b'\r\n' in raw else b'\n'
+            file_path.write_bytes(cleaned)
             return True
-            
+
         except Exception as e:
-            self.logger.error(f"处理出错 {file_path.name}: {e}")
+            self.logger.error("处理出错 %s: %s", file_path.name, e)
             return False
     
     def _print_summary(self, result: ClearResult) -> None:
@@ -16,6 +16,7 @@ class Config:
     API_TIMEOUT: int = 180
     API_TEMPERATURE: float = 1.0
     API_MAX_TOKENS: int = 8000
+    MAX_CONCURRENT_REQUESTS: int = 4
     
     # ===== 路径配置 =====
     BASE_DIR: Path = Path(__file__).parent
@@ -57,10 +58,13 @@ class Config:
     
     @classmethod
     def _ensure_directories(cls) -> Optional[str]:
-        """确保必要目录存在"""
+        """确保必要目录存在（先扫描一次 BASE_DIR，温启动时省去逐目录 stat）"""
         try:
+            existing = {entry.name for entry in os.scandir(cls.BASE_DIR) if entry.is_dir()}
             for attr in cls._REQUIRED_DIRS:
-                getattr(cls, attr).mkdir(exist_ok=True)
+                directory = getattr(cls, attr)
+                if directory.name not in existing:
+                    directory.mkdir(parents=True, exist_ok=True)
             return None
         except Exception as e:
             return f"创建目录失败: {e}"
@@ -3,12 +3,17 @@
 日记读取和解析模块
 """
 
+import mmap
+import operator
+import pickle
 import re
-from dataclasses import dataclass, field
+from dataclasses import dataclass
 from datetime import datetime
+from functools import cached_property, lru_cache
 from pathlib import Path
-from typing import List, Optional, Tuple
+from typing import List, Optional, Sequence, Tuple
 
+from config import Config
 from logger import Logger
 
 
@@ -16,14 +21,25 @@ from logger import Logger
 # 配置类
 # ============================================================
 
-@dataclass
+@dataclass(frozen=True)
 class SectionVariants:
-    """日记各部分的标题变体配置"""
-    todo: List[str] = field(default_factory=lambda: ["今日待办", "待办", "todo", "Todo", "TODOs"])
-    record: List[str] = field(default_factory=lambda: ["随手记录", "记录", "record", "Record", "日志", "流水"])
-    thought: List[str] = field(default_factory=lambda: ["心情", "心情和想法", "想法", "thought", "Thought", "感悟", "思考"])
-    attachment: List[str] = field(default_factory=lambda: ["附件", "附件 / 链接", "attachments", "Attachments", "附件和链接"])
-    ai_comment: List[str] = field(default_factory=lambda: ["AI 说", "AI说", "AI评价", "AI建议"])
+    """日记各部分的标题变体配置（不可变，可哈希，便于共享编译后的正则）"""
+    todo: Tuple[str, ...] = ("今日待办", "待办", "todo", "Todo", "TODOs")
+    record: Tuple[str, ...] = ("随手记录", "记录", "record", "Record", "日志", "流水")
+    thought: Tuple[str, ...] = ("心情", "心情和想法", "想法", "thought", "Thought", "感悟", "思考")
+    attachment: Tuple[str, ...] = ("附件", "附件 / 链接", "attachments", "Attachments", "附件和链接")
+    ai_comment: Tuple[str, ...] = ("AI 说", "AI说", "AI评价", "AI建议")
+
+
+@lru_cache(maxsize=None)
+def _compile_marker_union(markers: Tuple[str, ...]) -> re.Pattern:
+    """编译匹配任意一个章节标题的联合正则（按变体元组缓存）
+
+    变体按长度降序排列：共享前缀的分支（如 "附件 / 链接" 与 "附件"）
+    先尝试长变体，避免短前缀抢先匹配及其引发的回溯。
+    """
+    alternation = '|'.join(re.escape(m) for m in sorted(markers, key=len, reverse=True))
+    return re.compile(rf'^#+\s*(?:{alternation})\s*$', re.MULTILINE | re.IGNORECASE)
 
 
 # ============================================================
@@ -33,13 +49,8 @@ class SectionVariants:
 class MarkdownParser:
     """Markdown 文档解析工具类"""
     
-    # 列表项匹配模式（预编译提升性能）
-    LIST_PATTERNS = [
-        re.compile(r'^[-*]\s*(.+)$'),       # - 或 * 开头
-        re.compile(r'^\d+\.\s*(.+)$'),       # 数字开头
-        re.compile(r'^\[\s*\]\s*(.+)$'),     # [ ] 待办格式
-        re.compile(r'^\[\s*x\s*\]\s*(.+)$', re.IGNORECASE),  # [x] 完成格式
-    ]
+    # 列表项匹配模式（联合正则，单次匹配：-/* 、数字、[ ] 与 [x] 格式）
+    LIST_ITEM_PATTERN = re.compile(r'^\s*(?:[-*]|\d+\.|\[\s*[xX]?\s*\])\s*(\S.*?)\s*$')
     
     @staticmethod
     def extract_title(content: str, default: str = "") -> str:
@@ -50,7 +61,7 @@ class MarkdownParser:
         return default
     
     @staticmethod
-    def find_section_boundary(content: str, section_names: List[str]) -> Optional[Tuple[int, int]]:
+    def find_section_boundary(content: str, section_names: Sequence[str]) -> Optional[Tuple[int, int]]:
         """查找指定章节的边界，返回 (start, end) 或 None"""
         for name in section_names:
             pattern = rf'^#+\s*{re.escape(name)}\s*$'
@@ -63,24 +74,19 @@ class MarkdownParser:
         return None
     
     @staticmethod
-    def find_first_marker_position(content: str, markers: List[str]) -> int:
+    def find_first_marker_position(content: str, markers: Tuple[str, ...]) -> int:
         """查找第一个匹配标记的位置，未找到返回内容长度"""
-        min_pos = len(content)
-        for marker in markers:
-            pattern = rf'^#+\s*{re.escape(marker)}\s*$'
-            match = re.search(pattern, content, re.MULTILINE | re.IGNORECASE)
-            if match and match.start() < min_pos:
-                min_pos = match.start()
-        return min_pos
-    
+        match = _compile_marker_union(markers).search(content)
+        return match.start() if match else len(content)
+
     @classmethod
-    def extract_section_text(cls, content: str, section_names: List[str]) -> str:
+    def extract_section_text(cls, content: str, section_names: Sequence[str]) -> str:
         """提取章节的纯文本内容"""
         boundary = cls.find_section_boundary(content, section_names)
         return content[boundary[0]:boundary[1]].strip() if boundary else ""
-    
+
     @classmethod
-    def extract_section_items(cls, content: str, section_names: List[str]) -> List[str]:
+    def extract_section_items(cls, content: str, section_names: Sequence[str]) -> List[str]:
         """提取章节中的列表项（去重）"""
         text = cls.extract_section_text(content, section_names)
         if not text:
@@ -91,22 +97,21 @@ class MarkdownParser:
     def _parse_list_items(cls, text: str) -> List[str]:
         """从文本中解析列表项"""
         items = []
-        for line in text.split('\n'):
-            line = line.strip()
-            if not line:
-                continue
-            for pattern in cls.LIST_PATTERNS:
-                match = pattern.match(line)
-                if match:
-                    items.append(match.group(1).strip())
-                    break
+        for line in text.splitlines():
+            if match := cls.LIST_ITEM_PATTERN.match(line):
+                items.append(match.group(1))
         return items
     
     @staticmethod
     def _deduplicate(items: List[str]) -> List[str]:
-        """列表去重，保持顺序"""
+        """列表去重，保持顺序（条目在解析时已 strip 过）"""
         seen = set()
-        return [x for x in items if x and x not in seen and not seen.add(x)]
+        result = []
+        for item in items:
+            if item and item not in seen:
+                seen.add(item)
+                result.append(item)
+        return result
 
 
 # ============================================================
@@ -130,23 +135,28 @@ class DiaryEntry:
     def __str__(self) -> str:
         return f"DiaryEntry({self.date.strftime('%Y-%m-%d')})"
 
+    @cached_property
+    def _date_header(self) -> str:
+        """标题行（日期格式化只做一次，批量格式化时复用）"""
+        return f"# {self.date:%Y年%m月%d日} {self.title}"
+
     def format_for_ai(self, include_todos: bool = True) -> str:
         """格式化日记内容，用于发送给 AI"""
         sections = []
         if include_todos:
             sections.append(("## 待办事项", self.todos))
-        
+
         sections.extend([
             ("## 记录", self.records),
             ("## 想法", self.thoughts),
         ])
-        
-        parts = [f"# {self.date.strftime('%Y年%m月%d日')} {self.title}", ""]
+
+        parts = [self._date_header, ""]
         for header, items in sections:
             parts.append(header)
-            parts.extend(f"- {item}" for item in items) if items else parts.append("无")
+            parts.append("\n".join(f"- {item}" for item in items) if items else "无")
             parts.append("")
-        
+
         return "\n".join(parts)
 
 
@@ -157,29 +167,70 @@ class DiaryEntry:
 class DiaryReader:
     """读取和解析日记文件"""
     
+    # 解析结果缓存文件（按 mtime/size 判断是否需要重新解析）
+    PARSE_CACHE_FILE = "_parse_cache.pkl"
+    # 超过该大小的文件用 mmap 读取，直接从页缓存解码
+    MMAP_THRESHOLD = 64 * 1024
+
     def __init__(self, diary_dirs: List[Path], variants: Optional[SectionVariants] = None):
         self.diary_dirs = diary_dirs
         self.logger = Logger.get_logger("DiaryReader")
         self.variants = variants or SectionVariants()
-    
+        self._cache_path = Config.LOG_DIR / self.PARSE_CACHE_FILE
+        self._parse_cache = self._load_parse_cache()
+        self._cache_dirty = False
+
     def read_diary_file(self, file_path: Path) -> Optional[DiaryEntry]:
-        """读取单个日记文件"""
-        if not file_path.exists():
+        """读取单个日记文件（文件未变动时复用上次的解析结果）"""
+        try:
+            stat = file_path.stat()
+        except OSError:
             self.logger.debug(f"文件不存在: {file_path}")
             return None
-        
+
+        cache_key = str(file_path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        cached = self._parse_cache.get(cache_key)
+        if cached and cached[0] == signature:
+            return cached[1]
+
         date = self._parse_date_from_filename(file_path)
         if not date:
             return None
-        
+
         content = self._read_file_content(file_path)
         if content is None:
             return None
-        
+
         entry = DiaryEntry(date, file_path)
         entry.raw_content = content
         self._parse_diary_content(entry, content)
+
+        self._parse_cache[cache_key] = (signature, entry)
+        self._cache_dirty = True
         return entry
+
+    def _load_parse_cache(self) -> dict:
+        """加载解析缓存，失败时从空缓存开始"""
+        try:
+            return pickle.loads(self._cache_path.read_bytes())
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            self.logger.debug(f"解析缓存不可用，将重新解析: {e}")
+            return {}
+
+    def _save_parse_cache(self) -> None:
+        """保存解析缓存（尽力而为，失败不影响主流程）"""
+        if not self._cache_dirty:
+            return
+        try:
+            self._cache_path.write_bytes(
+                pickle.dumps(self._parse_cache, protocol=pickle.HIGHEST_PROTOCOL)
+            )
+            self._cache_dirty = False
+        except Exception as e:
+            self.logger.debug(f"保存解析缓存失败: {e}")
     
     def _parse_date_from_filename(self, file_path: Path) -> Optional[datetime]:
         """从文件名解析日期"""
@@ -190,9 +241,13 @@ class DiaryReader:
             return None
     
     def _read_file_content(self, file_path: Path) -> Optional[str]:
-        """读取文件内容"""
+        """读取文件内容（大文件 mmap 后直接解码，避免中间 bytes 拷贝）"""
         try:
-            return file_path.read_text(encoding='utf-8', errors='ignore')
+            if file_path.stat().st_size > self.MMAP_THRESHOLD:
+                with file_path.open('rb') as f:
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                        return str(mm, 'utf-8', 'ignore')
+            return str(file_path.read_bytes(), 'utf-8', 'ignore')
         except Exception as e:
             self.logger.error(f"读取文件失败 {file_path}: {e}")
             return None
@@ -239,7 +294,8 @@ class DiaryReader:
             if diary := self.read_diary_file(file_path):
                 diaries.append(diary)
         
-        diaries.sort(key=lambda x: x.date)
+        diaries.sort(key=operator.attrgetter('date'))
+        self._save_parse_cache()
         self.logger.info(f"成功解析 {len(diaries)}/{len(md_files)} 篇日记")
         return diaries
     
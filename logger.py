@@ -1,33 +1,30 @@
 #!/usr/bin/env python3
 """日志管理模块"""
 
+import functools
 import logging
 import sys
 from datetime import datetime
-from typing import Dict, Optional
+from typing import Optional
 
 from config import Config
 
 
 class Logger:
     """统一日志管理类"""
-    
-    _loggers: Dict[str, logging.Logger] = {}
+
     _CONSOLE_FORMAT = "%(levelname)s: %(message)s"
-    
-    @classmethod
-    def get_logger(cls, name: str = "DiaryAssistant") -> logging.Logger:
-        """获取或创建logger实例"""
-        if name in cls._loggers:
-            return cls._loggers[name]
-        
+
+    @staticmethod
+    @functools.lru_cache(maxsize=None)
+    def get_logger(name: str = "DiaryAssistant") -> logging.Logger:
+        """获取或创建logger实例（按名称缓存，只初始化一次）"""
         logger = logging.getLogger(name)
         logger.setLevel(getattr(logging, Config.LOG_LEVEL))
-        
+
         if not logger.handlers:
-            cls._setup_handlers(logger)
-        
-        cls._loggers[name] = logger
+            Logger._setup_handlers(logger)
+
         return logger
     
     @classmethod
@@ -3,9 +3,17 @@
 日记分析助手 - 使用 DeepSeek API 分析日记，提供智能建议
 """
 
+import atexit
+import bisect
+import operator
+import queue
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
 from pathlib import Path
-from typing import List, Optional
+from types import SimpleNamespace
+from typing import List, Optional, Tuple
 
 sys.path.insert(0, str(Path(__file__).parent))
 
@@ -27,6 +35,13 @@ class DiaryAssistant:
         self.weekly_manager: Optional[WeeklySummaryManager] = None
         self.user_profile: Optional[UserProfile] = None
         self.diaries: List[DiaryEntry] = []
+        # 历史周总结缓存：同一 ISO 周内的日记共享一份结果
+        self._hist_summaries_cache: dict = {}
+        # 与 self.diaries 平行的有序日期数组，供二分查找切片
+        self._sorted_dates: list = []
+        # 逐篇评价时的写盘队列：文件写入放到后台线程，与下一次 LLM 请求重叠
+        self._write_queue: "queue.Queue[Optional[Tuple[Path, str]]]" = queue.Queue()
+        self._writer_thread: Optional[threading.Thread] = None
     
     # ===== 初始化 =====
     
@@ -60,6 +75,8 @@ class DiaryAssistant:
             self.user_profile = UserProfile(Config.BASE_DIR / "user_profile.json")
             self.analyzer = DeepSeekAnalyzer(Config.LOG_DIR, Config.OUTPUT_DIR, self.user_profile)
             self.weekly_manager = WeeklySummaryManager(Config.WEEKLY_SUMMARY_DIR)
+            # 画像采用延迟保存，进程退出前兜底写盘
+            atexit.register(self.user_profile.flush)
             self.logger.info("组件初始化成功")
             return True
         except Exception as e:
@@ -87,18 +104,35 @@ class DiaryAssistant:
         return True
     
     def _show_recent_diaries(self, count: int = 5) -> None:
-        """显示最近的日记信息"""
-        self.logger.info(f"\n最近 {min(count, len(self.diaries))} 篇日记:")
-        for diary in self.diaries[-count:]:
-            self.logger.info(
-                f"  📅 {diary.date:%Y-%m-%d}: "
-                f"{len(diary.todos)}个待办 / {len(diary.records)}条记录 / {len(diary.thoughts)}条想法"
-            )
+        """显示最近的日记信息（合并为一条日志，减少 handler 分发次数）"""
+        lines = [f"\n最近 {min(count, len(self.diaries))} 篇日记:"]
+        lines.extend(
+            f"  📅 {diary.date:%Y-%m-%d}: "
+            f"{len(diary.todos)}个待办 / {len(diary.records)}条记录 / {len(diary.thoughts)}条想法"
+            for diary in self.diaries[-count:]
+        )
+        self.logger.info("\n".join(lines))
     
+    def _refresh_sorted_dates(self) -> None:
+        """重建与日记列表平行的日期数组（日记列表排序或变动后调用）"""
+        self._sorted_dates = [d.date for d in self.diaries]
+
     def _get_context_diaries(self, current: DiaryEntry) -> List[DiaryEntry]:
-        """获取当前日记所在周的上下文日记"""
+        """获取当前日记所在周的上下文日记（有序列表上二分切片）"""
+        if len(self._sorted_dates) != len(self.diaries):
+            self._refresh_sorted_dates()
         week = self.weekly_manager.get_week_info(current.date)
-        return [d for d in self.diaries if week.start_date <= d.date <= current.date]
+        lo = bisect.bisect_left(self._sorted_dates, week.start_date)
+        hi = bisect.bisect_right(self._sorted_dates, current.date)
+        return self.diaries[lo:hi]
+
+    def _get_historical_summaries(self, diary) -> list:
+        """获取日记之前的历史周总结（按 ISO 周缓存，一周内的日记共用磁盘读取结果）"""
+        week = self.weekly_manager.get_week_info(diary.date)
+        key = (week.year, week.week)
+        if key not in self._hist_summaries_cache:
+            self._hist_summaries_cache[key] = self.weekly_manager.get_historical_summaries(diary.date)
+        return self._hist_summaries_cache[key]
     
     # ===== 每日评价 =====
     
@@ -107,58 +141,156 @@ class DiaryAssistant:
         Logger.log_separator(self.logger)
         self.logger.info("🤖 检查每日评价...")
         Logger.log_separator(self.logger)
-        
-        self.diaries.sort(key=lambda x: x.date)
-        count = 0
-        
-        for i, diary in enumerate(self.diaries):
-            if diary.ai_comment:
-                continue
-            
-            if self._process_single_diary(diary, i):
-                count += 1
-                if not self._handle_post_evaluation(diary):
-                    break
-        
+
+        # attrgetter 是 C 级可调用对象，且输入已接近有序时 Timsort 近乎线性
+        self.diaries.sort(key=operator.attrgetter('date'))
+        self._refresh_sorted_dates()
+        pending = [(i, diary) for i, diary in enumerate(self.diaries) if not diary.ai_comment]
+
+        if len(pending) > 1 and not Config.PAUSE_AFTER_DAILY_EVALUATION:
+            count = self._process_evaluations_parallel(pending)
+        else:
+            count = self._process_evaluations_sequential(pending)
+
         self.logger.info(f"✓ {'所有日记都已有评价' if count == 0 else f'完成 {count} 篇日记的评价生成'}")
         return True
-    
-    def _process_single_diary(self, diary: DiaryEntry, index: int) -> bool:
-        """处理单篇日记的评价"""
-        self.logger.info(f"[{index+1}/{len(self.diaries)}] 发现未评价日记: {diary.date:%Y-%m-%d}")
-        
-        historical = self.weekly_manager.get_historical_summaries(diary.date)
-        context = self._get_context_diaries(diary)
-        
-        # 获取截至当前日期的所有日记，用于构建完整的待办列表
-        all_diaries_until_now = [d for d in self.diaries if d.date <= diary.date]
-        
-        evaluation = self.analyzer.generate_daily_evaluation(diary, context, historical, all_diaries=all_diaries_until_now)
+
+    def _process_evaluations_sequential(self, pending: List[Tuple[int, DiaryEntry]]) -> int:
+        """逐篇生成评价（单篇或需要逐篇确认时）
+
+        当前请求等待网络返回时，后台线程预取下一篇的上下文，
+        把上下文构建的耗时隐藏在 LLM 延迟里。
+        """
+        count = 0
+        with ThreadPoolExecutor(max_workers=1) as prefetcher:
+            next_future = None
+            for pos, (i, diary) in enumerate(pending):
+                ctx = next_future.result() if next_future else self._build_context(diary)
+                next_future = (prefetcher.submit(self._build_context, pending[pos + 1][1])
+                               if pos + 1 < len(pending) else None)
+
+                if self._process_single_diary(diary, i, ctx):
+                    count += 1
+                    if not self._handle_post_evaluation(diary, ctx):
+                        break
+        return count
+
+    def _process_evaluations_parallel(self, pending: List[Tuple[int, DiaryEntry]]) -> int:
+        """并行生成评价（请求并发；记忆更新与文件写入在主线程按日期顺序执行）"""
+        workers = min(len(pending), Config.MAX_CONCURRENT_REQUESTS)
+        self.logger.info(f"发现 {len(pending)} 篇未评价日记，并行生成（并发数 {workers}）...")
+
+        # 上下文在发起请求前统一构建（只依赖已加载的日记，不依赖新生成的评价）
+        contexts = [self._build_context(diary) for _, diary in pending]
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            evaluations = list(executor.map(
+                lambda args: self.analyzer.generate_daily_evaluation(
+                    args[0], args[1].context, args[1].historical,
+                    all_diaries=args[1].all_until,
+                    interactive=False, process_memory=False),
+                ((diary, ctx) for (_, diary), ctx in zip(pending, contexts))
+            ))
+
+        count = 0
+        for ((i, diary), ctx, evaluation) in zip(pending, contexts, evaluations):
+            if not evaluation:
+                self.logger.error("生成评价失败: %s", diary.date.date())
+                continue
+
+            evaluation = self.analyzer.apply_memory_updates(evaluation)
+            if not self.reader.append_ai_comment(diary.file_path, evaluation):
+                self.logger.error("添加评价失败: %s", diary.file_path.name)
+                continue
+
+            self.logger.info("✓ 已添加评价到 %s", diary.file_path.name)
+            diary.ai_comment = evaluation
+            count += 1
+
+            # 周日的周分析仍按日期顺序串行生成
+            if diary.date.weekday() == 6:
+                self.logger.info("-" * Config.SEPARATOR_LENGTH)
+                self.logger.info("📅 检测到周日 (%s)，正在生成周分析报告...", diary.date.date())
+                self.analyzer.generate_weekly_analysis(ctx.context, ctx.historical,
+                                                       all_diaries=ctx.all_until)
+        return count
+
+    def _diaries_until(self, diary: DiaryEntry) -> List[DiaryEntry]:
+        """获取截至指定日记（含当日）的所有日记（有序列表上二分切片）"""
+        if len(self._sorted_dates) != len(self.diaries):
+            self._refresh_sorted_dates()
+        return self.diaries[:bisect.bisect_right(self._sorted_dates, diary.date)]
+
+    def _build_context(self, diary: DiaryEntry) -> SimpleNamespace:
+        """构建一篇日记的评价上下文（历史周总结、本周日记、截至当日的全部日记）"""
+        return SimpleNamespace(
+            historical=self._get_historical_summaries(diary),
+            context=self._get_context_diaries(diary),
+            all_until=self._diaries_until(diary),
+        )
+
+    def _process_single_diary(self, diary: DiaryEntry, index: int,
+                              ctx: Optional[SimpleNamespace] = None) -> bool:
+        """处理单篇日记的评价（ctx 可由调用方预取）"""
+        # %-style 延迟格式化：日志被过滤时不做任何字符串拼接
+        self.logger.info("[%d/%d] 发现未评价日记: %s", index + 1, len(self.diaries), diary.date.date())
+
+        if ctx is None:
+            ctx = self._build_context(diary)
+
+        evaluation = self.analyzer.generate_daily_evaluation(diary, ctx.context, ctx.historical,
+                                                             all_diaries=ctx.all_until)
         if not evaluation:
             self.logger.error("生成评价失败")
             return False
-        
-        if not self.reader.append_ai_comment(diary.file_path, evaluation):
-            self.logger.error("添加评价失败")
-            return False
-        
-        self.logger.info(f"✓ 已添加评价到 {diary.file_path.name}")
+
+        # 写盘交给后台线程，主循环立即进入下一次 LLM 请求
+        self._ensure_writer()
+        self._write_queue.put((diary.file_path, evaluation))
         diary.ai_comment = evaluation
         return True
+
+    def _ensure_writer(self) -> None:
+        """按需启动后台写盘线程"""
+        if self._writer_thread is None:
+            self._writer_thread = threading.Thread(target=self._writer_loop, daemon=True)
+            self._writer_thread.start()
+
+    def _writer_loop(self) -> None:
+        """消费写盘队列，收到 None 哨兵后退出"""
+        while True:
+            item = self._write_queue.get()
+            try:
+                if item is None:
+                    return
+                file_path, evaluation = item
+                if self.reader.append_ai_comment(file_path, evaluation):
+                    self.logger.info("✓ 已添加评价到 %s", file_path.name)
+                else:
+                    self.logger.error("添加评价失败: %s", file_path.name)
+            finally:
+                self._write_queue.task_done()
+
+    def _drain_writes(self) -> None:
+        """等待队列清空并结束写盘线程"""
+        if self._writer_thread is not None:
+            self._write_queue.join()
+            self._write_queue.put(None)
+            self._writer_thread.join()
+            self._writer_thread = None
     
-    def _handle_post_evaluation(self, diary: DiaryEntry) -> bool:
-        """处理评价后的操作（周分析、暂停确认）"""
+    def _handle_post_evaluation(self, diary: DiaryEntry,
+                                ctx: Optional[SimpleNamespace] = None) -> bool:
+        """处理评价后的操作（周分析、暂停确认），ctx 复用评价时已构建的上下文"""
         # 周日生成周分析
         if diary.date.weekday() == 6:
             self.logger.info("-" * Config.SEPARATOR_LENGTH)
-            self.logger.info(f"📅 检测到周日 ({diary.date:%Y-%m-%d})，正在生成周分析报告...")
-            context = self._get_context_diaries(diary)
-            historical = self.weekly_manager.get_historical_summaries(diary.date)
-            
-            # 获取截至当前日期的所有日记
-            all_diaries_until_now = [d for d in self.diaries if d.date <= diary.date]
-            
-            self.analyzer.generate_weekly_analysis(context, historical, all_diaries=all_diaries_until_now)
+            self.logger.info("📅 检测到周日 (%s)，正在生成周分析报告...", diary.date.date())
+            if ctx is None:
+                ctx = self._build_context(diary)
+
+            self.analyzer.generate_weekly_analysis(ctx.context, ctx.historical,
+                                                   all_diaries=ctx.all_until)
         
         # 暂停确认
         if Config.PAUSE_AFTER_DAILY_EVALUATION:
@@ -169,34 +301,94 @@ class DiaryAssistant:
         return True
     
     # ===== 周总结 =====
-    
+
+    # 上次周总结检查的输入指纹文件（输入未变时跳过整个检查）
+    WEEKLY_FP_FILE = ".weekly_fp"
+
+    def _weekly_fingerprint(self) -> str:
+        """周总结检查的输入指纹：日记数量、最新日记日期、总结目录 mtime"""
+        try:
+            dir_mtime = Config.WEEKLY_SUMMARY_DIR.stat().st_mtime_ns
+        except OSError:
+            dir_mtime = 0
+        # 带上今天的日期：跨天后一周可能新「完整经过」，需要重新检查
+        return f"{len(self.diaries)}|{self.diaries[-1].date:%Y-%m-%d}|{dir_mtime}|{date.today()}"
+
+    def _save_weekly_fingerprint(self) -> None:
+        """记录本次检查的指纹（在所有总结就绪后调用）"""
+        try:
+            (Config.BASE_DIR / self.WEEKLY_FP_FILE).write_text(
+                self._weekly_fingerprint(), encoding='utf-8')
+        except OSError as e:
+            self.logger.debug(f"写入周总结指纹失败: {e}")
+
     def check_and_generate_weekly_summaries(self) -> bool:
         """检查并生成缺失的周总结"""
         Logger.log_separator(self.logger)
         self.logger.info("📊 检查周总结...")
         Logger.log_separator(self.logger)
-        
+
+        # 输入未变（重复运行的常见情形）时直接跳过分组与目录扫描
+        fp_path = Config.BASE_DIR / self.WEEKLY_FP_FILE
+        try:
+            if fp_path.read_text(encoding='utf-8') == self._weekly_fingerprint():
+                self.logger.info("✓ 所有已完整经过的周都已有总结")
+                return True
+        except OSError:
+            pass
+
         weeks = self.weekly_manager.group_diaries_by_week(self.diaries)
         need_summary = self.weekly_manager.get_weeks_need_summary(weeks)
-        
+
         if not need_summary:
+            self._save_weekly_fingerprint()
             self.logger.info("✓ 所有已完整经过的周都已有总结")
             return True
-        
+
         self.logger.info(f"发现 {len(need_summary)} 周需要生成总结")
-        
+
+        if len(need_summary) > 1:
+            if success := self._generate_summaries_parallel(need_summary):
+                self._save_weekly_fingerprint()
+            return success
+
         for i, week in enumerate(need_summary, 1):
             self.logger.info(f"\n[{i}/{len(need_summary)}] 正在生成 {week} 的总结...")
-            
+
             if summary := self.analyzer.generate_weekly_summary(week):
                 self.weekly_manager.save_summary(week, summary)
                 self.logger.info(f"✓ {week} 总结完成")
             else:
                 self.logger.error(f"生成 {week} 的总结失败")
                 return False
-        
+
+        self._save_weekly_fingerprint()
         self.logger.info("\n✓ 所有周总结已生成完毕")
         return True
+
+    def _generate_summaries_parallel(self, need_summary) -> bool:
+        """并行生成多周总结（请求并发，保存仍在主线程串行执行）"""
+        workers = min(len(need_summary), Config.MAX_CONCURRENT_REQUESTS)
+        self.logger.info(f"并行生成 {len(need_summary)} 周的总结（并发数 {workers}）...")
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            summaries = list(executor.map(
+                lambda week: self.analyzer.generate_weekly_summary(week, interactive=False),
+                need_summary
+            ))
+
+        success = True
+        for week, summary in zip(need_summary, summaries):
+            if summary:
+                self.weekly_manager.save_summary(week, summary)
+                self.logger.info(f"✓ {week} 总结完成")
+            else:
+                self.logger.error(f"生成 {week} 的总结失败")
+                success = False
+
+        if success:
+            self.logger.info("\n✓ 所有周总结已生成完毕")
+        return success
     
     # ===== 主流程 =====
     
@@ -211,15 +403,19 @@ class DiaryAssistant:
                 return
             
             self.process_daily_evaluations()
-            
+            self.user_profile.flush()
+
             Logger.log_separator(self.logger)
             self.logger.info("✨ 程序执行完成")
             Logger.log_separator(self.logger)
-            
+
         except KeyboardInterrupt:
             self.logger.info("\n\n⚠️  用户中断程序")
         except Exception as e:
             self.logger.error(f"程序运行出错: {e}", exc_info=True)
+        finally:
+            # 无论如何都把已生成的评价落盘，避免付费请求的结果随中断丢失
+            self._drain_writes()
 
 
 def main():
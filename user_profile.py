@@ -5,8 +5,28 @@
 
 import json
 import difflib
+import os
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Set
+
+try:
+    import orjson  # C 实现的 JSON，序列化/反序列化显著快于标准库
+except ImportError:
+    orjson = None
+
+try:
+    import ahocorasick  # pyahocorasick：多模式子串匹配自动机（可选依赖）
+except ImportError:
+    ahocorasick = None
+
+try:
+    # C++ 实现的相似度计算，远快于 difflib（可选依赖）
+    from rapidfuzz import fuzz as _rf_fuzz, process as _rf_process
+except ImportError:
+    _rf_fuzz = _rf_process = None
+
+# 模糊操作条数超过该阈值时才构建 Aho-Corasick 自动机（摊销构建成本）
+_AC_BATCH_THRESHOLD = 8
 
 from logger import Logger
 
@@ -17,15 +37,38 @@ class UserProfile:
     def __init__(self, profile_path: Path):
         self.profile_path = profile_path
         self.logger = Logger.get_logger("UserProfile")
+        # 上次写盘（或加载）的序列化字节，内容未变时跳过写文件
+        self._last_bytes: bytes = None
         self.facts: List[str] = self._load_profile()
+        # 并行维护的 记忆 -> 下标 索引，让成员判断与定位都是 O(1)（列表保持顺序）
+        self._fact_index = {f: i for i, f in enumerate(self.facts)}
+        # 三元组倒排索引（模糊子串匹配的候选过滤），在首次查询时惰性构建
+        self._trigram_index: Dict[str, Set[int]] = {}
+        self._trigram_dirty = True
+        # 有未落盘的修改时为 True（update 延迟保存，由 flush 统一写盘）
+        self._dirty = False
+        # 增量维护的总字数与渲染文本缓存（读远多于写）
+        self._total_length = sum(len(f) for f in self.facts)
+        self._text_cache: str = None
+
+    def reload(self):
+        """从磁盘重新加载画像（如用户手动编辑后）"""
+        self.facts = self._load_profile()
+        self._fact_index = {f: i for i, f in enumerate(self.facts)}
+        self._trigram_dirty = True
+        self._total_length = sum(len(f) for f in self.facts)
+        self._text_cache = None
 
     def _load_profile(self) -> List[str]:
         """加载用户画像"""
-        if not self.profile_path.exists():
+        try:
+            raw = self.profile_path.read_bytes()
+        except FileNotFoundError:
             self.logger.debug("用户画像文件不存在，初始化为空")
             return []
+        self._last_bytes = raw
         try:
-            data = json.loads(self.profile_path.read_text(encoding='utf-8'))
+            data = orjson.loads(raw) if orjson is not None else json.loads(raw)
             if isinstance(data, list):
                 self.logger.debug(f"已加载 {len(data)} 条记忆")
                 return [str(item) for item in data]
@@ -34,30 +77,56 @@ class UserProfile:
             self.logger.error(f"加载用户画像失败: {e}")
             return []
 
+    def _serialize_facts(self) -> bytes:
+        """序列化记忆列表（优先 orjson，缺失时退回标准库）"""
+        if orjson is not None:
+            return orjson.dumps(self.facts, option=orjson.OPT_INDENT_2)
+        return json.dumps(self.facts, ensure_ascii=False, indent=2).encode('utf-8')
+
     def save_profile(self):
-        """保存用户画像"""
+        """保存用户画像（写入临时文件后原子替换，避免写坏正式文件）
+
+        序列化结果与上次写盘内容一致时（如 add/remove 相互抵消），
+        不触碰文件。
+        """
         try:
-            self.profile_path.write_text(
-                json.dumps(self.facts, ensure_ascii=False, indent=2),
-                encoding='utf-8'
-            )
+            new_bytes = self._serialize_facts()
+            if new_bytes == self._last_bytes:
+                self._dirty = False
+                return
+            tmp_path = self.profile_path.with_suffix('.json.tmp')
+            tmp_path.write_bytes(new_bytes)
+            os.replace(tmp_path, self.profile_path)
+            self._last_bytes = new_bytes
+            self._dirty = False
             self.logger.info("用户画像已保存")
         except Exception as e:
             self.logger.error(f"保存用户画像失败: {e}")
 
+    def flush(self):
+        """将积累的修改写盘（批量评价期间 update 只标记，不逐次保存）"""
+        if self._dirty:
+            self.save_profile()
+
     def get_profile_text(self) -> str:
-        """获取格式化的画像文本"""
+        """获取格式化的画像文本（缓存渲染结果，修改时失效）"""
         if not self.facts:
             return "暂无个人信息记录。"
-        return "\n".join(f"- {fact}" for fact in self.facts)
+        if self._text_cache is None:
+            self._text_cache = "\n".join(f"- {fact}" for fact in self.facts)
+        return self._text_cache
 
     def get_profile_length(self) -> int:
-        """获取画像总字数"""
-        return sum(len(fact) for fact in self.facts)
+        """获取画像总字数（增量维护，O(1)）"""
+        return self._total_length
 
     def update_facts(self, new_facts: List[str]):
-        """替换所有记忆"""
-        self.facts = new_facts
+        """替换所有记忆（去重，保留首次出现的顺序）"""
+        self.facts = list(dict.fromkeys(new_facts))
+        self._fact_index = {f: i for i, f in enumerate(self.facts)}
+        self._trigram_dirty = True
+        self._total_length = sum(len(f) for f in self.facts)
+        self._text_cache = None
         self.save_profile()
         self.logger.info(f"画像已更新，共 {len(self.facts)} 条")
 
@@ -76,88 +145,205 @@ class UserProfile:
 
         if added or removed or updated:
             self.logger.info(f"画像更新: +{added}, -{removed}, ~{updated}")
-            self.save_profile()
+            self._dirty = True
 
     def _handle_add(self, facts_to_add: List[str]) -> int:
         """处理添加操作"""
         count = 0
         for fact in facts_to_add:
-            if fact and fact not in self.facts:
+            if fact and fact not in self._fact_index:
                 self.facts.append(fact)
+                self._fact_index[fact] = len(self.facts) - 1
+                self._trigram_dirty = True
+                self._total_length += len(fact)
+                self._text_cache = None
                 count += 1
         return count
 
+    def _remove_fact(self, fact: str):
+        """从列表和下标索引中同步移除一条记忆"""
+        idx = self._fact_index.pop(fact, None)
+        if idx is None or idx >= len(self.facts) or self.facts[idx] != fact:
+            # 索引未命中或失步时退回列表查找，绝不静默跳过删除
+            try:
+                idx = self.facts.index(fact)
+            except ValueError:
+                return
+        self.facts.pop(idx)
+        # 被移除位置之后的记忆下标整体前移
+        for i in range(idx, len(self.facts)):
+            self._fact_index[self.facts[i]] = i
+        self._trigram_dirty = True
+        self._total_length -= len(fact)
+        self._text_cache = None
+
+    # ===== 模糊子串匹配的倒排索引 =====
+
+    @staticmethod
+    def _trigrams(text: str) -> Set[str]:
+        """提取字符串的所有三字符片段"""
+        return {text[i:i + 3] for i in range(len(text) - 2)}
+
+    def _rebuild_trigram_index(self):
+        """重建三元组倒排索引（片段 -> 包含它的记忆下标）"""
+        index: Dict[str, Set[int]] = {}
+        for i, fact in enumerate(self.facts):
+            for gram in self._trigrams(fact):
+                index.setdefault(gram, set()).add(i)
+        self._trigram_index = index
+        self._trigram_dirty = False
+
+    def _substring_candidates(self, query: str) -> List[int]:
+        """返回包含 query 子串的记忆下标（先用倒排索引收缩候选，再精确验证）"""
+        if len(query) < 3:
+            # 查询太短无法取三元组，退回全量扫描
+            return [i for i, f in enumerate(self.facts) if query in f]
+
+        if self._trigram_dirty:
+            self._rebuild_trigram_index()
+
+        posting = None
+        for gram in self._trigrams(query):
+            ids = self._trigram_index.get(gram)
+            if not ids:
+                return []
+            posting = set(ids) if posting is None else posting & ids
+            if not posting:
+                return []
+
+        return [i for i in sorted(posting) if query in self.facts[i]]
+
+    def _batch_substring_candidates(self, queries: List[str]) -> Dict[str, List[str]]:
+        """批量求子串候选（查询 -> 包含该子串的记忆文本列表）
+
+        查询较多时用 Aho-Corasick 自动机对每条记忆只做一次线性扫描；
+        自动机不可用或批量太小时退回逐条倒排索引查询。
+        """
+        if ahocorasick is not None and len(queries) > _AC_BATCH_THRESHOLD:
+            automaton = ahocorasick.Automaton()
+            for q in set(queries):
+                automaton.add_word(q, q)
+            automaton.make_automaton()
+            result: Dict[str, List[str]] = {q: [] for q in queries}
+            for fact in self.facts:
+                seen = set()
+                for _, q in automaton.iter(fact):
+                    if q not in seen:
+                        seen.add(q)
+                        result[q].append(fact)
+            return result
+        return {q: [self.facts[i] for i in self._substring_candidates(q)]
+                for q in queries}
+
+    def _best_fuzzy_match(self, query: str):
+        """在全部记忆中找与 query 最相似的一条
+
+        命中（相似度 > 0.8）时返回 (记忆文本, 下标, 相似度)，否则返回 None。
+        优先使用 RapidFuzz，缺失时退回 difflib。
+        """
+        if _rf_process is not None:
+            match = _rf_process.extractOne(query, self.facts,
+                                           scorer=_rf_fuzz.ratio, score_cutoff=80)
+            if match is None:
+                return None
+            return match[0], match[2], match[1] / 100.0
+
+        # 阈值设定为 0.8，确保匹配度足够高；以阈值为下界可尽早剪枝
+        best_ratio = 0.8
+        best_idx = -1
+        qlen = len(query)
+        for i, f in enumerate(self.facts):
+            # 长度相差超过一倍时相似度必然低于阈值，直接跳过
+            if not qlen * 0.5 <= len(f) <= qlen * 2.0:
+                continue
+            sm = difflib.SequenceMatcher(None, query, f)
+            # 由粗到精的上界估算，低于当前最优则无需算完整相似度
+            if sm.real_quick_ratio() <= best_ratio or sm.quick_ratio() <= best_ratio:
+                continue
+            ratio = sm.ratio()
+            if ratio > best_ratio:
+                best_ratio = ratio
+                best_idx = i
+        if best_idx >= 0:
+            return self.facts[best_idx], best_idx, best_ratio
+        return None
+
     def _handle_remove(self, facts_to_remove: List[str]) -> int:
         """处理删除操作"""
+        fuzzy = [f for f in facts_to_remove if f and f not in self._fact_index]
+        candidates_map = self._batch_substring_candidates(fuzzy) if fuzzy else {}
         count = 0
         for fact in facts_to_remove:
             if not fact:
                 continue
-            if fact in self.facts:
-                self.facts.remove(fact)
+            if fact in self._fact_index:
+                self._remove_fact(fact)
                 count += 1
             else:
                 # 模糊匹配
-                candidates = [f for f in self.facts if fact in f]
-                if len(candidates) == 1:
-                    self.facts.remove(candidates[0])
+                candidates = candidates_map.get(fact, [])
+                if len(candidates) == 1 and candidates[0] in self._fact_index:
+                    self._remove_fact(candidates[0])
                     count += 1
                 else:
-                    # 尝试使用 difflib 进行相似度匹配
-                    best_ratio = 0
-                    best_match = None
-                    
-                    for f in self.facts:
-                        ratio = difflib.SequenceMatcher(None, fact, f).ratio()
-                        if ratio > best_ratio:
-                            best_ratio = ratio
-                            best_match = f
-                    
-                    if best_ratio > 0.8:
-                        self.logger.info(f"模糊匹配删除成功 (相似度 {best_ratio:.2f}): '{fact}' -> '{best_match}'")
-                        self.facts.remove(best_match)
+                    # 尝试相似度匹配
+                    if match := self._best_fuzzy_match(fact):
+                        best_match, _, ratio = match
+                        self.logger.info(f"模糊匹配删除成功 (相似度 {ratio:.2f}): '{fact}' -> '{best_match}'")
+                        self._remove_fact(best_match)
                         count += 1
                     else:
                         self.logger.warning(f"无法找到要删除的记忆: {fact}")
         return count
 
+    def _replace_fact(self, idx: int, new_fact: str):
+        """替换指定位置的记忆并同步下标索引
+
+        新值已存在于其它位置时（LLM 的去重式更新），删除旧记忆而不是
+        制造一条索引无法表示的重复记忆。
+        """
+        old_fact = self.facts[idx]
+        existing = self._fact_index.get(new_fact)
+        if existing is not None and existing != idx:
+            self._remove_fact(old_fact)
+            return
+        self._fact_index.pop(old_fact, None)
+        self.facts[idx] = new_fact
+        self._fact_index[new_fact] = idx
+        self._trigram_dirty = True
+        self._total_length += len(new_fact) - len(old_fact)
+        self._text_cache = None
+
     def _handle_update(self, updates: List[Dict]) -> int:
         """处理更新操作"""
+        fuzzy = [item["old"] for item in updates
+                 if item.get("old") and item.get("old") not in self._fact_index]
+        candidates_map = self._batch_substring_candidates(fuzzy) if fuzzy else {}
         count = 0
         for item in updates:
             old_fact = item.get("old")
             new_fact = item.get("new")
             if not old_fact or new_fact is None:
                 continue
-            
-            if old_fact in self.facts:
-                idx = self.facts.index(old_fact)
-                self.facts[idx] = new_fact
+
+            if old_fact in self._fact_index:
+                self._replace_fact(self._fact_index[old_fact], new_fact)
                 count += 1
             else:
                 # 模糊匹配
-                candidates = [(i, f) for i, f in enumerate(self.facts) if old_fact in f]
-                if len(candidates) == 1:
-                    idx, original = candidates[0]
-                    self.facts[idx] = original.replace(old_fact, new_fact)
+                candidates = candidates_map.get(old_fact, [])
+                if len(candidates) == 1 and candidates[0] in self._fact_index:
+                    idx = self._fact_index[candidates[0]]
+                    self._replace_fact(idx, self.facts[idx].replace(old_fact, new_fact))
                     count += 1
                 else:
-                    # 尝试使用 difflib 进行相似度匹配
+                    # 尝试相似度匹配
                     # 当 LLM 返回的 old_fact 与现有记忆有轻微差异（如标点、个别字词）时使用
-                    best_ratio = 0
-                    best_idx = -1
-                    
-                    for i, f in enumerate(self.facts):
-                        ratio = difflib.SequenceMatcher(None, old_fact, f).ratio()
-                        if ratio > best_ratio:
-                            best_ratio = ratio
-                            best_idx = i
-                    
-                    # 阈值设定为 0.8，确保匹配度足够高
-                    if best_ratio > 0.8:
-                        self.logger.info(f"模糊匹配成功 (相似度 {best_ratio:.2f}):\n原句: {old_fact}\n匹配: {self.facts[best_idx]}")
+                    if match := self._best_fuzzy_match(old_fact):
+                        best_match, best_idx, ratio = match
+                        self.logger.info(f"模糊匹配成功 (相似度 {ratio:.2f}):\n原句: {old_fact}\n匹配: {best_match}")
                         # 在这种情况下，通常 old_fact 是对整条记忆的复述，所以直接替换整条记忆
-                        self.facts[best_idx] = new_fact
+                        self._replace_fact(best_idx, new_fact)
                         count += 1
                     else:
                         self.logger.warning(f"无法找到要更新的记忆: {old_fact}")
@@ -3,7 +3,11 @@
 每周总结管理模块
 """
 
+import functools
+import operator
+import os
 import re
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
@@ -11,6 +15,9 @@ from typing import Dict, List, Optional, Tuple
 from diary_reader import DiaryEntry
 from logger import Logger
 
+# 周日记渲染中各篇之间的分隔线
+_DIARY_SEPARATOR = "=" * 50
+
 
 class WeekInfo:
     """周信息类"""
@@ -21,26 +28,50 @@ class WeekInfo:
         self.start_date = start_date
         self.end_date = end_date
         self.diaries: List[DiaryEntry] = []
-    
+        # 日期字符串只在构造时格式化一次，下游直接取用
+        self.start_iso = start_date.strftime('%Y-%m-%d')
+        self.end_iso = end_date.strftime('%Y-%m-%d')
+        self.start_cn = start_date.strftime('%Y年%m月%d日')
+        self.end_cn = end_date.strftime('%Y年%m月%d日')
+        # 文件名与显示字符串在构造后不会变化，同样只格式化一次
+        self._filename = (f"{year}_W{week:02d}_"
+                          f"{start_date.strftime('%Y%m%d')}-{end_date.strftime('%Y%m%d')}.md")
+        self._str = f"{year}年第{week}周 ({self.start_iso} 至 {self.end_iso})"
+
     def __str__(self) -> str:
-        return f"{self.year}年第{self.week}周 ({self.start_date.strftime('%Y-%m-%d')} 至 {self.end_date.strftime('%Y-%m-%d')})"
-    
+        return self._str
+
     def get_filename(self) -> str:
         """获取总结文件名"""
-        return f"{self.year}_W{self.week:02d}_{self.start_date.strftime('%Y%m%d')}-{self.end_date.strftime('%Y%m%d')}.md"
+        return self._filename
 
     def format_for_ai(self) -> str:
         """格式化周日记内容用于 AI 生成总结"""
         header = f"""# {self.year}年第{self.week}周日记
-**时间范围**: {self.start_date.strftime('%Y年%m月%d日')} 至 {self.end_date.strftime('%Y年%m月%d日')}
+**时间范围**: {self.start_cn} 至 {self.end_cn}
 
 """
         parts = [header]
         for diary in self.diaries:
-            parts.extend([diary.format_for_ai(), "", "="*50, ""])
+            parts.extend([diary.format_for_ai(), "", _DIARY_SEPARATOR, ""])
         return "\n".join(parts)
 
 
+@functools.lru_cache(maxsize=None)
+def _week_key(date: datetime) -> Tuple[int, int, datetime]:
+    """计算日期对应的 (ISO 年, ISO 周, 周一日期)，不构造 WeekInfo"""
+    monday = date - timedelta(days=date.weekday())
+    iso_year, iso_week, _ = monday.isocalendar()
+    return iso_year, iso_week, monday
+
+
+@functools.lru_cache(maxsize=None)
+def _week_info_for(date: datetime) -> WeekInfo:
+    """计算指定日期所在周的信息（按日期缓存，返回的共享实例不挂载日记列表）"""
+    iso_year, iso_week, monday = _week_key(date)
+    return WeekInfo(iso_year, iso_week, monday, monday + timedelta(days=6))
+
+
 class WeeklySummaryManager:
     """每周总结管理器"""
     
@@ -51,14 +82,13 @@ class WeeklySummaryManager:
         self.weekly_summary_dir = weekly_summary_dir
         self.logger = Logger.get_logger("WeeklySummary")
         self.weekly_summary_dir.mkdir(exist_ok=True)
+        # get_all_summaries 的结果缓存：(目录 mtime_ns, 总结列表)
+        self._summaries_cache: Optional[Tuple[int, List[Tuple[WeekInfo, str]]]] = None
     
     @staticmethod
     def get_week_info(date: datetime) -> WeekInfo:
-        """获取指定日期所在周的信息（周一到周日）"""
-        monday = date - timedelta(days=date.weekday())
-        sunday = monday + timedelta(days=6)
-        iso_year, iso_week, _ = monday.isocalendar()
-        return WeekInfo(iso_year, iso_week, monday, sunday)
+        """获取指定日期所在周的信息（周一到周日，同一日期返回缓存的共享实例）"""
+        return _week_info_for(date)
     
     def group_diaries_by_week(self, diaries: List[DiaryEntry]) -> List[WeekInfo]:
         """将日记按周分组"""
@@ -67,19 +97,23 @@ class WeeklySummaryManager:
         
         week_dict: Dict[Tuple[int, int], WeekInfo] = {}
         for diary in diaries:
-            week_info = self.get_week_info(diary.date)
-            key = (week_info.year, week_info.week)
-            if key not in week_dict:
-                week_dict[key] = week_info
-            week_dict[key].diaries.append(diary)
+            # 先算轻量的周键，仅在首次遇到该周时才构造 WeekInfo
+            iso_year, iso_week, monday = _week_key(diary.date)
+            week_info = week_dict.get((iso_year, iso_week))
+            if week_info is None:
+                week_info = WeekInfo(iso_year, iso_week, monday, monday + timedelta(days=6))
+                week_dict[(iso_year, iso_week)] = week_info
+            week_info.diaries.append(diary)
         
-        weeks = sorted(week_dict.values(), key=lambda w: w.start_date)
+        weeks = sorted(week_dict.values(), key=operator.attrgetter('start_date'))
         self.logger.info(f"日记已分组为 {len(weeks)} 周")
         return weeks
     
-    def is_week_complete(self, week_info: WeekInfo) -> bool:
-        """检查一周是否已完整经过"""
-        return week_info.end_date.date() < datetime.now().date()
+    def is_week_complete(self, week_info: WeekInfo, today=None) -> bool:
+        """检查一周是否已完整经过（today 可由调用方提供以复用时钟读取）"""
+        if today is None:
+            today = datetime.now().date()
+        return week_info.end_date.date() < today
     
     def has_summary(self, week_info: WeekInfo) -> bool:
         """检查某周是否已有总结"""
@@ -91,25 +125,60 @@ class WeeklySummaryManager:
     
     def get_weeks_need_summary(self, weeks: List[WeekInfo]) -> List[WeekInfo]:
         """获取需要生成总结的周"""
-        return [w for w in weeks 
-                if self.is_week_complete(w) and w.diaries and not self.has_summary(w)]
+        # 一次 scandir 列出已有总结文件，避免逐周 stat
+        try:
+            existing = {entry.name for entry in os.scandir(self.weekly_summary_dir)}
+        except OSError:
+            existing = set()
+        # 时钟只读一次，整个循环使用同一天作为判断基准
+        today = datetime.now().date()
+        return [w for w in weeks
+                if self.is_week_complete(w, today) and w.diaries
+                and w.get_filename() not in existing]
     
     def get_all_summaries(self) -> List[Tuple[WeekInfo, str]]:
-        """获取所有已有的周总结内容"""
+        """获取所有已有的周总结内容
+
+        先解析文件名过滤掉无关文件，再用线程池并发读取以重叠磁盘 IO，
+        解码在主线程完成。结果按目录 mtime 缓存，目录未变时直接复用。
+        """
+        try:
+            dir_mtime = self.weekly_summary_dir.stat().st_mtime_ns
+        except OSError:
+            dir_mtime = None
+        if self._summaries_cache is not None and self._summaries_cache[0] == dir_mtime:
+            return self._summaries_cache[1]
+
         summaries = []
         try:
-            for filepath in sorted(self.weekly_summary_dir.glob("*.md")):
-                week_info = self._parse_filename(filepath)
-                if week_info:
-                    content = filepath.read_text(encoding='utf-8')
-                    summaries.append((week_info, content))
+            # scandir 只产出文件名字符串，避免为每个目录项构造 Path 再 fnmatch
+            names = sorted(entry.name for entry in os.scandir(self.weekly_summary_dir)
+                           if entry.name.endswith('.md'))
+            parsed = [(week_info, self.weekly_summary_dir / name)
+                      for name in names
+                      if (week_info := self._parse_filename(name))]
+            if parsed:
+                with ThreadPoolExecutor(max_workers=min(8, len(parsed))) as executor:
+                    contents = list(executor.map(lambda item: item[1].read_bytes(), parsed))
+
+                summaries = [(week_info, raw.decode('utf-8'))
+                             for (week_info, _), raw in zip(parsed, contents)]
+            if dir_mtime is not None:
+                self._summaries_cache = (dir_mtime, summaries)
         except Exception as e:
             self.logger.error(f"读取总结目录失败: {e}")
         return summaries
     
-    def _parse_filename(self, filepath: Path) -> Optional[WeekInfo]:
+    # 合法文件名形如 2026_W35_20260824-20260830.md，定长 29
+    FILENAME_LENGTH = 29
+
+    def _parse_filename(self, name: str) -> Optional[WeekInfo]:
         """从文件名解析周信息"""
-        match = self.FILENAME_PATTERN.match(filepath.name)
+        # 先用廉价的字符串检查挡掉明显不匹配的文件，再跑正则
+        if (len(name) != self.FILENAME_LENGTH or name[4] != '_' or name[5] != 'W'
+                or not name.endswith('.md')):
+            return None
+        match = self.FILENAME_PATTERN.match(name)
         if not match:
             return None
         
@@ -126,7 +195,7 @@ class WeeklySummaryManager:
         filepath = self.get_summary_path(week_info)
         
         meta = f"""# {week_info.year}年第{week_info.week}周总结
-**时间范围**: {week_info.start_date.strftime('%Y年%m月%d日')} 至 {week_info.end_date.strftime('%Y年%m月%d日')}
+**时间范围**: {week_info.start_cn} 至 {week_info.end_cn}
 **生成时间**: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
 **日记数量**: {len(week_info.diaries)} 篇
 